@@ -2,3 +2,18 @@ MAX_FILE_SIZE_MB = 5  # Максимальный размер получаемо
 MAX_FILE_SIZE = (
     MAX_FILE_SIZE_MB * 1024 * 1024
 )  # Расчет максимального размера получаемого файла из MAX_FILE_SIZE_MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Размер фрагмента записи файла на диск в байтах
+# Количество SQL запросов за один HTTP запрос, после которого пишется предупреждение (не в prod)
+QUERY_COUNT_WARNING = 10
+# Количество твитов, сериализуемых за один шаг: между шагами цикл событий обслуживает другие запросы
+TWEETS_SERIALIZATION_SLICE = 50
+API_KEY_CACHE_SIZE = 10_000  # Максимальное количество API ключей в кэше пользователей
+API_KEY_CACHE_TTL = 60  # Время жизни записи в кэше пользователей в секундах
+DB_DISPOSE_TIMEOUT = 5  # Время закрытия соединений с БД при остановке в секундах
+# Максимальный размер кэша лент твитов в байтах. Лента не разбита на страницы, поэтому размер
+# каждой записи растет вместе с таблицей твитов, и ограничение по количеству лент не ограничивает память
+FEED_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Время жизни ленты твитов в кэше в секундах. Версия ленты хранится в памяти процесса, поэтому
+# при нескольких воркерах изменения в одном воркере не сбрасывают кэш других: там лента может
+# отставать до FEED_CACHE_TTL секунд. Для нескольких воркеров нужен общий счетчик версий (например, в Redis)
+FEED_CACHE_TTL = 10
@@ -1,11 +1,29 @@
+import asyncio
+import logging
 import os
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator
 
 from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Параметры пула соединений, по умолчанию рассчитаны на ~60 одновременных запросов
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # в секундах
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # в секундах
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true")
+
 
 def get_database_url() -> str:
     if os.environ.get("ENV") == "test":
@@ -19,12 +37,97 @@ def get_database_url() -> str:
     return url_engine
 
 
-engine = create_async_engine(get_database_url())
+# URL вычисляется один раз при импорте модуля
+DATABASE_URL = get_database_url()
+
+
+def get_connect_args() -> dict[str, Any]:
+    """
+    Возвращает дополнительные параметры подключения asyncpg.
+
+    За pgbouncer (режим transaction) подготовленные выражения не переживают смену
+    серверного соединения, поэтому их кэширование отключается.
+    """
+    if not DB_PGBOUNCER:
+        return {}
+
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "server_settings": {"jit": "off"},
+    }
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    connect_args=get_connect_args(),
+)
 async_session = async_sessionmaker(
     autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
 )
+# Сессии только для чтения: транзакция открывается как READ ONLY и использует тот же пул
+readonly_async_session = async_sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine.execution_options(postgresql_readonly=True),
+    expire_on_commit=False,
+)
+
+
+# Счетчик SQL запросов текущего HTTP запроса (None, если счетчик не включен)
+query_counter: ContextVar[list[int] | None] = ContextVar("query_counter", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def count_query(*args: Any) -> None:
+    """
+    Увеличивает счетчик SQL запросов текущего HTTP запроса, если он включен.
+    """
+    counter = query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+async def warmup_pool() -> None:
+    """
+    Заранее открывает DB_POOL_SIZE соединений и возвращает их в пул.
+
+    Соединения открываются одновременно, чтобы пул не выдавал одно и то же соединение
+    повторно. Ошибки подключения не прерывают запуск приложения и записываются в лог:
+    недостающие соединения будут открыты при первых запросах.
+    """
+    connections = await asyncio.gather(
+        *(engine.connect().start() for _ in range(DB_POOL_SIZE)),
+        return_exceptions=True,
+    )
+    errors = [conn for conn in connections if isinstance(conn, BaseException)]
+    if errors:
+        logger.warning(
+            "Не удалось заранее открыть %d из %d соединений с базой данных",
+            len(errors),
+            DB_POOL_SIZE,
+            exc_info=errors[0],
+        )
+    await asyncio.gather(
+        *(conn.close() for conn in connections if isinstance(conn, AsyncConnection))
+    )
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         yield session
+
+
+async def get_readonly_session() -> AsyncGenerator[AsyncSession, None]:
+    async with readonly_async_session() as session:
+        yield session
+
+
+async def get_auth_session() -> AsyncGenerator[AsyncSession, None]:
+    async with readonly_async_session() as session:
+        yield session
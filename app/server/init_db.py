@@ -2,7 +2,7 @@ import asyncio
 
 from database.database import async_session, engine
 from models.models import Base, User
-from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
 
 async def init_db() -> None:
@@ -18,22 +18,24 @@ async def init_db() -> None:
 async def add_test_user() -> None:
     """
     Добавляет тестовых пользователей в базу данных.
+
+    Уже существующие пользователи (по имени) пропускаются средствами самой базы данных
+    через INSERT ... ON CONFLICT DO NOTHING.
     """
     async with async_session() as session:
-        existing_users = await session.execute(select(User.name))
-        existing_users_names = {user for user in existing_users.scalars().all()}
-
-        new_test_user = User(name="test_user", api_key="test")
-        new_222_user = User(name="222_user", api_key="222")
-        new_333_user = User(name="333_user", api_key="333")
-
-        new_users = [new_test_user, new_222_user, new_333_user]
-        new_users_for_add = []
-        for user in new_users:
-            if user.name not in existing_users_names:
-                new_users_for_add.append(user)
-
-        session.add_all(new_users_for_add)
+        new_users = (
+            insert(User)
+            .values(
+                [
+                    {"name": "test_user", "api_key": "test"},
+                    {"name": "222_user", "api_key": "222"},
+                    {"name": "333_user", "api_key": "333"},
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.name])
+        )
+
+        await session.execute(new_users)
         await session.commit()
 
 
@@ -1,16 +1,77 @@
+import asyncio
+import logging
+import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from database.database import engine
+from config import DB_DISPOSE_TIMEOUT, QUERY_COUNT_WARNING
+from database.database import engine, query_counter, warmup_pool
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from routes.routes import router
+from routes.utils import ServiceException, service_exception_handler
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Ошибка вместо предупреждения о возможной проблеме N+1, включается в тестах и CI
+QUERY_COUNT_RAISE = os.getenv("QUERY_COUNT_RAISE", "false").lower() in ("1", "true")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    await warmup_pool()
     yield
-    await engine.dispose()
+    try:
+        await asyncio.wait_for(engine.dispose(), timeout=DB_DISPOSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Соединения с базой данных не закрылись за %d с", DB_DISPOSE_TIMEOUT
+        )
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(router, prefix="/api")
+app.add_exception_handler(
+    ServiceException, service_exception_handler  # type: ignore[arg-type]
+)
+
+
+class NPlusOneMiddleware:
+    """
+    ASGI middleware, которая считает SQL запросы HTTP запроса и сообщает о возможной проблеме N+1.
+
+    Подключается только в режимах dev и test, чтобы ленивые загрузки связей обнаруживались
+    во время разработки, а рабочее окружение без явного ENV не считало запросы. Реализована
+    без BaseHTTPMiddleware, поэтому не меняет обработку запросов по сравнению с prod.
+
+    Атрибуты:
+        app (ASGIApp): Следующее ASGI приложение.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        token = query_counter.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            query_counter.reset(token)
+
+        if counter[0] > QUERY_COUNT_WARNING:
+            message = "{method} {path} выполнил {count} SQL запросов, возможна проблема N+1".format(
+                method=scope["method"], path=scope["path"], count=counter[0]
+            )
+            if QUERY_COUNT_RAISE:
+                raise RuntimeError(message)
+            logger.warning(message)
+
+
+if os.getenv("ENV") in ("dev", "test"):
+    app.add_middleware(NPlusOneMiddleware)
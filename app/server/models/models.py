@@ -1,4 +1,4 @@
-from sqlalchemy import ARRAY, ForeignKey, Integer, String
+from sqlalchemy import ARRAY, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -34,10 +34,13 @@ class Tweet(Base):
     content: Mapped[str] = mapped_column(String(280), nullable=False)
     attachments: Mapped[list[str]] = mapped_column(ARRAY(String))
 
-    # lazy="joined" позволяет подгружать данные о пользователе сразу вместе с твитом
-    user: Mapped["User"] = relationship("User", back_populates="tweets", lazy="joined")
+    # lazy="selectin" подгружает связанные данные одним запросом WHERE ... IN (...)
+    # по всем загруженным твитам, без размножения строк JOIN'ом
+    user: Mapped["User"] = relationship(
+        "User", back_populates="tweets", lazy="selectin"
+    )
     likes: Mapped[list["Like"]] = relationship(
-        "Like", back_populates="tweet", lazy="subquery", cascade="all, delete-orphan"
+        "Like", back_populates="tweet", lazy="selectin", cascade="all, delete-orphan"
     )
 
 
@@ -79,7 +82,8 @@ class User(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
-    api_key: Mapped[str] = mapped_column(String, unique=True, index=True)
+    # Ограниченная длина: ключ API не длиннее SHA256 в hex (64 символа)
+    api_key: Mapped[str] = mapped_column(String(64), unique=True, index=True)
 
     tweets: Mapped[list["Tweet"]] = relationship("Tweet", back_populates="user")
     likes: Mapped[list["Like"]] = relationship("Like", back_populates="user")
@@ -111,6 +115,11 @@ class Follow(Base):
     """
 
     __tablename__ = "followers"
+    # Первичный ключ (follower_id, followed_id) не помогает при поиске подписчиков пользователя,
+    # обратный составной индекс позволяет получить подписчиков только из индекса
+    __table_args__ = (
+        Index("ix_follow_followed_follower", "followed_id", "follower_id"),
+    )
 
     follower_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("users.id"), primary_key=True
@@ -136,6 +145,8 @@ class Like(Base):
     """
 
     __tablename__ = "likes"
+    # Первичный ключ (tweet_id, user_id) не помогает при поиске лайков пользователя
+    __table_args__ = (Index("ix_likes_user_tweet", "user_id", "tweet_id"),)
 
     tweet_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("tweets.id"), nullable=False, primary_key=True
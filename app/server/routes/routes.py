@@ -1,7 +1,6 @@
-from config import MAX_FILE_SIZE_MB
-from database.database import get_session
+from database.database import get_auth_session, get_readonly_session, get_session
 from fastapi import APIRouter, Depends, Header, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from schemas.schemas import (
     ExceptionOutSchema,
     MediaOutSchema,
@@ -19,29 +18,58 @@ from .services import (
     MediaService,
     TweetService,
     UserService,
+    get_user_id,
 )
-from .utils import return_exception
+from .utils import return_result
 
-__all__ = ["get_session"]
+__all__ = ["get_auth_session", "get_readonly_session", "get_session"]
 
 router = APIRouter()
 
 
+async def get_current_user_id(
+    api_key: str = Header(default=..., alias="api-key"),
+    session: AsyncSession = Depends(get_auth_session),
+) -> int:
+    """
+    Получить идентификатор текущего пользователя по API ключу.
+
+    Поиск выполняется в отдельной сессии только для чтения: соединение берется из пула
+    лишь при промахе кэша и сразу возвращается, а не простаивает в транзакции рядом
+    с сессией роута до конца запроса.
+
+    Параметры:
+        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        session (AsyncSession): Сессия базы данных для поиска пользователя.
+
+    Возвращает:
+        int: Идентификатор пользователя.
+
+    Ошибки:
+        401: Пользователь не найден.
+    """
+    try:
+        return await get_user_id(session=session, api_key=api_key)
+    finally:
+        # Сессия закрывается сразу после поиска, не дожидаясь завершения запроса
+        await session.close()
+
+
 @router.get(
     path="/tweets",
     response_model=TweetsOutSchema,
     responses={401: {"model": ExceptionOutSchema}, 404: {"model": ExceptionOutSchema}},
 )
 async def get_tweets(
-    session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> TweetsOutSchema | JSONResponse:
+    session: AsyncSession = Depends(get_readonly_session),
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Получить список твитов пользователя и его подписок.
 
     Параметры:
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         TweetsOutSchema: Список твитов.
@@ -49,22 +77,9 @@ async def get_tweets(
     Ошибки:
         401: Пользователь не найден.
     """
-    result = await TweetService(session=session, api_key=api_key).get()
-
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif isinstance(result, TweetsOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    content = await TweetService(session=session, user_id=current_user_id).get_json()
+
+    return Response(content=content, media_type="application/json")
 
 
 @router.post(
@@ -76,15 +91,15 @@ async def get_tweets(
 async def add_tweet(
     tweet_data: TweetInSchema,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> TweetOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Добавить новый твит.
 
     Параметры:
         tweet_data (TweetInSchema): Данные о твите.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         TweetOutSchema: Созданный твит.
@@ -93,30 +108,11 @@ async def add_tweet(
         401: Пользователь не найден.
         404: Файл не найден.
     """
-    result = await TweetService(session=session, api_key=api_key).post(
+    result = await TweetService(session=session, user_id=current_user_id).post(
         tweet_data=tweet_data
     )
 
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Файл не найден",
-        )
-    elif isinstance(result, TweetOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    return return_result(result, status_code=201)
 
 
 @router.delete(
@@ -131,15 +127,15 @@ async def add_tweet(
 async def delete_tweet(
     tweet_id: int,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Удалить твит по идентификатору.
 
     Параметры:
         tweet_id (int): Идентификатор твита, который необходимо удалить.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutSchema: Результат удаления твита.
@@ -149,36 +145,11 @@ async def delete_tweet(
         403: Недостаточно прав для удаления твита.
         404: Твит не найден.
     """
-    result = await TweetService(session=session, api_key=api_key).delete(
+    result = await TweetService(session=session, user_id=current_user_id).delete(
         tweet_id=tweet_id
     )
 
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 403:
-        return return_exception(
-            status_code=403,
-            error_type="Forbidden",
-            error_message="Недостаточно прав",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Твит не найден",
-        )
-    elif isinstance(result, SuccessOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    return return_result(result)
 
 
 @router.post(
@@ -194,15 +165,15 @@ async def delete_tweet(
 async def like_tweet(
     tweet_id: int,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Поставить лайк на твит.
 
     Параметры:
         tweet_id (int): Идентификатор твита, на который ставится лайк.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutSchema: Результат операции.
@@ -212,34 +183,11 @@ async def like_tweet(
         401: Пользователь не найден.
         404: Твит не найден.
     """
-    result = await LikeService(session=session, api_key=api_key).post(tweet_id=tweet_id)
-
-    if result == 400:
-        return return_exception(
-            status_code=400,
-            error_type="LikeError",
-            error_message="Лайк уже стоит",
-        )
-    elif result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Твит не найден",
-        )
-    elif isinstance(result, SuccessOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    result = await LikeService(session=session, user_id=current_user_id).post(
+        tweet_id=tweet_id
+    )
+
+    return return_result(result, status_code=201)
 
 
 @router.delete(
@@ -250,15 +198,15 @@ async def like_tweet(
 async def dislike_tweet(
     tweet_id: int,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Убрать лайк с твита.
 
     Параметры:
         tweet_id (int): Идентификатор твита, с которого убирается лайк.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutSchema: Результат операции.
@@ -267,30 +215,11 @@ async def dislike_tweet(
         401: Пользователь не найден.
         404: Лайк не найден.
     """
-    result = await LikeService(session=session, api_key=api_key).delete(
+    result = await LikeService(session=session, user_id=current_user_id).delete(
         tweet_id=tweet_id
     )
 
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Твит не найден",
-        )
-    elif isinstance(result, SuccessOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    return return_result(result)
 
 
 @router.post(
@@ -306,15 +235,15 @@ async def dislike_tweet(
 async def add_media(
     file: UploadFile,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> MediaOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Добавить медиафайл.
 
     Параметры:
         file (UploadFile): Загружаемый файл.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         MediaOutSchema: Созданный медиафайл.
@@ -324,36 +253,11 @@ async def add_media(
         401: Пользователь не найден.
         404: Файл не найден.
     """
-    result = await MediaService(session=session, api_key=api_key).post(file=file)
-
-    if result == 400:
-        return return_exception(
-            status_code=400,
-            error_type="FileError",
-            error_message="Максимальный размер файла не должен превышать {MAX_FILE_SIZE_MB} МБ".format(
-                MAX_FILE_SIZE_MB=MAX_FILE_SIZE_MB
-            ),
-        )
-    elif result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Файл не найден",
-        )
-    elif isinstance(result, MediaOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    result = await MediaService(session=session, user_id=current_user_id).post(
+        file=file
+    )
+
+    return return_result(result, status_code=201)
 
 
 @router.get(
@@ -362,15 +266,15 @@ async def add_media(
     responses={401: {"model": ExceptionOutSchema}},
 )
 async def get_profile_my(
-    session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutUserSchema | JSONResponse:
+    session: AsyncSession = Depends(get_readonly_session),
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Получить профиль текущего пользователя.
 
     Параметры:
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutUserSchema: Данные профиля пользователя.
@@ -378,22 +282,9 @@ async def get_profile_my(
     Ошибки:
         401: Пользователь не найден.
     """
-    result = await UserService(session=session, api_key=api_key).get()
-
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif isinstance(result, SuccessOutUserSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    result = await UserService(session=session).get(user_id=current_user_id)
+
+    return return_result(result)
 
 
 @router.get(
@@ -403,8 +294,8 @@ async def get_profile_my(
 )
 async def get_profile_by_id(
     user_id: int,
-    session: AsyncSession = Depends(get_session),
-) -> SuccessOutUserSchema | JSONResponse:
+    session: AsyncSession = Depends(get_readonly_session),
+) -> Response:
     """
     Получить профиль пользователя по его идентификатору.
 
@@ -420,20 +311,7 @@ async def get_profile_by_id(
     """
     result = await UserService(session=session).get(user_id=user_id)
 
-    if result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif isinstance(result, SuccessOutUserSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    return return_result(result)
 
 
 @router.post(
@@ -450,15 +328,15 @@ async def get_profile_by_id(
 async def follow_user(
     user_id: int,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Подписаться на пользователя.
 
     Параметры:
         user_id (int): Идентификатор пользователя, на которого нужно подписаться.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutSchema: Результат операции.
@@ -469,40 +347,11 @@ async def follow_user(
         404: Пользователь для подписки не найден.
         409: Пользователь уже подписан на данного пользователя.
     """
-    result = await FollowService(session=session, api_key=api_key).post(user_id=user_id)
-
-    if result == 400:
-        return return_exception(
-            status_code=400,
-            error_type="FollowError",
-            error_message="Вы не можете подписаться на себя",
-        )
-    elif result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Пользователь для подписки не найден",
-        )
-    elif result == 409:
-        return return_exception(
-            status_code=409,
-            error_type="FollowError",
-            error_message="Вы уже подписаны на пользователя",
-        )
-    elif isinstance(result, SuccessOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    result = await FollowService(session=session, user_id=current_user_id).post(
+        user_id=user_id
+    )
+
+    return return_result(result, status_code=201)
 
 
 @router.delete(
@@ -517,15 +366,15 @@ async def follow_user(
 async def unfollow_user(
     user_id: int,
     session: AsyncSession = Depends(get_session),
-    api_key: str = Header(default=..., alias="api-key"),
-) -> SuccessOutSchema | JSONResponse:
+    current_user_id: int = Depends(get_current_user_id),
+) -> Response:
     """
     Убрать подписку на пользователя.
 
     Параметры:
         user_id (int): Идентификатор пользователя, от которого нужно отписаться.
         session (AsyncSession): Сессия базы данных.
-        api_key (str): API ключ пользователя, передаваемый в заголовке.
+        current_user_id (int): Идентификатор пользователя по API ключу из заголовка.
 
     Возвращает:
         SuccessOutSchema: Результат операции.
@@ -535,33 +384,8 @@ async def unfollow_user(
         401: Пользователь не найден.
         404: Подписка не найдена.
     """
-    result = await FollowService(session=session, api_key=api_key).delete(
+    result = await FollowService(session=session, user_id=current_user_id).delete(
         user_id=user_id
     )
 
-    if result == 400:
-        return return_exception(
-            status_code=400,
-            error_type="FollowError",
-            error_message="Вы не можете отписаться от себя",
-        )
-    elif result == 401:
-        return return_exception(
-            status_code=401,
-            error_type="Unauthorized",
-            error_message="Пользователь не найден",
-        )
-    elif result == 404:
-        return return_exception(
-            status_code=404,
-            error_type="NotFound",
-            error_message="Подписка не найдена",
-        )
-    elif isinstance(result, SuccessOutSchema):
-        return result.model_dump()
-    else:
-        return return_exception(
-            status_code=500,
-            error_type="Error",
-            error_message="Unexpected result type",
-        )
+    return return_result(result)
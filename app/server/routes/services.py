@@ -1,10 +1,19 @@
+import asyncio
 import os
-from typing import Optional
 
-import aiofiles
-from config import MAX_FILE_SIZE
+from cachetools import TTLCache
+from config import (
+    API_KEY_CACHE_SIZE,
+    API_KEY_CACHE_TTL,
+    FEED_CACHE_MAX_BYTES,
+    FEED_CACHE_TTL,
+    MAX_FILE_SIZE,
+    MAX_FILE_SIZE_MB,
+    TWEETS_SERIALIZATION_SLICE,
+)
 from fastapi import UploadFile
 from models.models import Follow, Like, Media, Tweet, User
+from pydantic import TypeAdapter
 from schemas.schemas import (
     AuthorSchema,
     LikeSchema,
@@ -18,12 +27,121 @@ from schemas.schemas import (
     UserOutSchema,
     UserSchema,
 )
-from sqlalchemy import select
+from sqlalchemy import exists, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, contains_eager, lazyload, raiseload, selectinload
+
+from .utils import ServiceException, create_path_img, save_img
+
+# Кэш соответствия API ключа идентификатору пользователя, чтобы не искать пользователя
+# в базе данных при каждом запросе
+_api_key_cache: TTLCache[str, int] = TTLCache(
+    maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL
+)
+
+
+# Кэш сериализованной ленты твитов по паре (пользователь, версия ленты). Версия увеличивается
+# при каждом изменении твитов, лайков или подписок, поэтому устаревшие ленты больше не читаются.
+# Размер записи считается в байтах JSON, поэтому кэш ограничивает занимаемую память
+_feed_cache: TTLCache[tuple[int, int], bytes] = TTLCache(
+    maxsize=FEED_CACHE_MAX_BYTES, ttl=FEED_CACHE_TTL, getsizeof=len
+)
+_feed_version = 0
+
+
+# Сериализатор среза ленты, создается один раз для всех запросов
+_tweets_adapter = TypeAdapter(list[TweetOutForListSchema])
+
+
+def invalidate_feed_cache() -> None:
+    """
+    Делает недействительными все закэшированные ленты твитов.
+    """
+    global _feed_version
+    _feed_version += 1
+
+
+async def dump_tweets_json(result: TweetsOutSchema) -> bytes:
+    """
+    Сериализует список твитов в JSON по частям.
+
+    pydantic-core удерживает GIL на все время сериализации, поэтому перенос в отдельный поток
+    не освобождает цикл событий. Вместо этого твиты сериализуются срезами по
+    TWEETS_SERIALIZATION_SLICE, а между срезами управление возвращается циклу событий.
+
+    Параметры:
+        result (TweetsOutSchema): Список твитов.
+
+    Возвращает:
+        bytes: Список твитов в формате JSON, как model_dump_json(by_alias=True).
+    """
+    parts: list[bytes] = []
+
+    for start in range(0, len(result.tweets), TWEETS_SERIALIZATION_SLICE):
+        if parts:
+            await asyncio.sleep(0)
+        tweets_slice = result.tweets[start : start + TWEETS_SERIALIZATION_SLICE]
+        # Срез сериализуется как JSON массив, квадратные скобки отбрасываются перед склейкой
+        parts.append(_tweets_adapter.dump_json(tweets_slice, by_alias=True)[1:-1])
+
+    # Кроме списка твитов схема содержит только постоянный флаг result
+    return b'{"result":true,"tweets":[' + b",".join(parts) + b"]}"
+
+
+async def get_user_id(session: AsyncSession, api_key: str) -> int:
+    """
+    Получает идентификатор пользователя по API ключу.
+
+    Параметры:
+        session (AsyncSession): Асинхронная сессия базы данных.
+        api_key (str): API ключ пользователя.
+
+    Возвращает:
+        int: Идентификатор пользователя.
+
+    Ошибки:
+        401: Пользователь не найден.
+    """
+    user_id = _api_key_cache.get(api_key)
+
+    if user_id is None:
+        user_id = await session.scalar(select(User.id).where(User.api_key == api_key))
+
+        if user_id is None:
+            raise ServiceException(401, "Unauthorized", "Пользователь не найден")
+
+        _api_key_cache[api_key] = user_id
+
+    return user_id
+
+
+def file_size_exception() -> ServiceException:
+    """
+    Возвращает ошибку превышения максимального размера загружаемого файла.
+    """
+    return ServiceException(
+        400,
+        "FileError",
+        "Максимальный размер файла не должен превышать {MAX_FILE_SIZE_MB} МБ".format(
+            MAX_FILE_SIZE_MB=MAX_FILE_SIZE_MB
+        ),
+    )
+
 
-from .utils import create_path_img, sorted_tweets
+def is_foreign_key_violation(exc: IntegrityError) -> bool:
+    """
+    Проверяет, что ошибка целостности вызвана нарушением внешнего ключа.
+
+    Параметры:
+        exc (IntegrityError): Ошибка целостности SQLAlchemy.
+
+    Возвращает:
+        bool: True, если запись ссылается на несуществующую строку.
+    """
+    # Адаптер asyncpg в SQLAlchemy передает код SQLSTATE ошибки базы данных, 23503 - foreign_key_violation
+    return getattr(exc.orig, "sqlstate", None) == "23503"
 
 
 class TweetService:
@@ -32,71 +150,69 @@ class TweetService:
 
     Атрибуты:
         _session (AsyncSession): Асинхронная сессия базы данных.
-        _api_key (str): API ключ пользователя.
+        _user_id (int): Идентификатор текущего пользователя.
     """
 
-    def __init__(self, session: AsyncSession, api_key: str):
+    def __init__(self, session: AsyncSession, user_id: int):
         self._session = session
-        self._api_key = api_key
-
-    async def _user(self) -> User | None:
-        """
-        Получает пользователя по API ключу.
-
-        Возвращает:
-            User | None: Объект пользователя, если найден, иначе None.
-        """
-        user_select = await self._session.execute(
-            select(User).where(User.api_key == self._api_key)
-        )
-        return user_select.scalar_one_or_none()
+        self._user_id = user_id
 
-    async def get(self) -> TweetOutForListSchema | int:
+    async def get(self) -> TweetsOutSchema:
         """
         Получает список твитов пользователя и его подписок.
 
         Возвращает:
-            TweetOutForListSchema | int: Список твитов или код ошибки.
+            TweetsOutSchema: Список твитов.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        following_users_select = await self._session.execute(
-            select(Follow.followed_id).where(Follow.follower_id == user.id)
+        # Подписки пользователя вместе с самим пользователем
+        following_users = (
+            select(Follow.followed_id)
+            .where(Follow.follower_id == self._user_id)
+            .union_all(select(literal(self._user_id)))
+        )
+        # Твиты с лайком пользователя или его подписок идут первыми, затем по количеству лайков
+        following_like = aliased(Like)
+        has_following_like = exists().where(
+            following_like.tweet_id == Tweet.id,
+            following_like.user_id.in_(following_users),
         )
-        following_users: list[int] = list(following_users_select.scalars().all())
-        following_users.insert(0, int(user.id))
 
         tweets_list_select = await self._session.execute(
-            select(Tweet).options(
-                selectinload(Tweet.user),
-                selectinload(Tweet.likes),
+            select(Tweet)
+            .outerjoin(Like, Like.tweet_id == Tweet.id)
+            .group_by(Tweet.id)
+            .order_by(
+                has_following_like.desc(), func.count(Like.user_id).desc(), Tweet.id
+            )
+            .options(
+                selectinload(Tweet.user).raiseload("*"),
+                selectinload(Tweet.likes).raiseload("*"),
+                selectinload(Tweet.likes).selectinload(Like.user).raiseload("*"),
+                raiseload("*"),
             )
         )
-        # selectinload подгружает данные связанных атрибутов
-
-        tweets_list: list[Tweet] = list(tweets_list_select.scalars().all())
+        # selectinload подгружает данные связанных атрибутов, авторы лайков
+        # загружаются одним запросом вместо отдельного запроса на каждый лайк.
+        # raiseload("*") запрещает остальные связи: обращение к незагруженной связи
+        # вызывает ошибку вместо скрытого запроса на каждый объект
 
-        if not tweets_list:
-            return TweetsOutSchema(tweets=[])
-
-        tweets_sorted: list[Tweet] = sorted_tweets(
-            tweets_list=tweets_list, following_users=following_users
-        )
+        tweets_sorted: list[Tweet] = list(tweets_list_select.scalars().all())
 
-        tweets_list_out = TweetsOutSchema(
+        # Данные из базы данных уже проверены, поэтому схемы собираются через model_construct
+        # без повторной валидации каждого поля
+        tweets_list_out = TweetsOutSchema.model_construct(
             tweets=[
-                TweetOutForListSchema(
-                    id=int(tweet.id),
-                    content=str(tweet.content),
-                    attachments=list(tweet.attachments),
-                    author=AuthorSchema(
-                        id=int(tweet.user.id), name=str(tweet.user.name)
+                TweetOutForListSchema.model_construct(
+                    id=tweet.id,
+                    content=tweet.content,
+                    attachments=tweet.attachments,
+                    author=AuthorSchema.model_construct(
+                        id=tweet.user.id, name=tweet.user.name
                     ),
                     likes=[
-                        LikeSchema(user_id=int(like.user.id), name=str(like.user.name))
+                        LikeSchema.model_construct(
+                            user_id=like.user.id, name=like.user.name
+                        )
                         for like in tweet.likes
                     ],
                 )
@@ -106,51 +222,68 @@ class TweetService:
 
         return tweets_list_out
 
-    async def post(self, tweet_data: TweetInSchema) -> TweetsOutSchema | int:
+    async def get_json(self) -> bytes:
         """
-        Создает новый твит.
+        Получает список твитов пользователя и его подписок в формате JSON.
 
-        Параметры:
-            tweet_data (TweetInSchema): Данные о твите.
+        Лента берется из кэша, если с момента ее сериализации твиты, лайки и подписки не менялись.
+        Большая лента сериализуется по частям, чтобы не блокировать цикл событий целиком.
 
         Возвращает:
-            TweetsOutSchema | int: Созданный твит или код ошибки.
+            bytes: Список твитов в формате JSON.
         """
-        user = await self._user()
+        key = (self._user_id, _feed_version)
+        content = _feed_cache.get(key)
 
-        if not user:
-            return 401
+        if content is None:
+            content = await dump_tweets_json(await self.get())
+            # Лента больше всего кэша не сохраняется: TTLCache отклоняет такую запись
+            if len(content) <= _feed_cache.maxsize:
+                _feed_cache[key] = content
 
-        tweet = tweet_data.model_dump()
-        tweet["user_id"] = user.id
+        return content
 
-        medias_select = await self._session.execute(select(Media.id))
-        medias = medias_select.scalars()
+    async def post(self, tweet_data: TweetInSchema) -> TweetOutSchema:
+        """
+        Создает новый твит.
 
-        if tweet["tweet_media_ids"] and not set(tweet["tweet_media_ids"]).issubset(
-            set(medias)
-        ):
-            return 404
+        Параметры:
+            tweet_data (TweetInSchema): Данные о твите.
+
+        Возвращает:
+            TweetOutSchema: Созданный твит.
+        """
+        tweet = tweet_data.model_dump()
+        tweet["user_id"] = self._user_id
 
-        tweet_media_ids = tweet["tweet_media_ids"]
+        tweet_media_ids = tweet.pop("tweet_media_ids")
+        attachments: list[str] = []
 
         if tweet_media_ids:
-            attachments_models = await self._session.execute(
-                select(Media.path_file).where(Media.id.in_(tweet_media_ids))
+            # Загружаются только запрошенные файлы, пути к ним сразу идут во вложения
+            medias_select = await self._session.execute(
+                select(Media.id, Media.path_file).where(Media.id.in_(tweet_media_ids))
             )
-            attachments = attachments_models.scalars().all()
-            tweet["tweet_media_ids"] = attachments
+            medias = medias_select.all()
 
-        tweet["attachments"] = tweet.pop("tweet_media_ids")
+            if len(medias) != len(set(tweet_media_ids)):
+                raise ServiceException(404, "NotFound", "Файл не найден")
 
-        tweet_model = Tweet(**tweet)
+            attachments = [media.path_file for media in medias]
 
-        self._session.add(tweet_model)
+        tweet["attachments"] = attachments
+
+        # Идентификатор нового твита возвращается тем же запросом, без повторного чтения твита
+        tweet_select = await self._session.execute(
+            insert(Tweet).values(**tweet).returning(Tweet.id)
+        )
+        tweet_id = tweet_select.scalar_one()
         await self._session.commit()
-        await self._session.refresh(tweet_model)
-        return TweetOutSchema.model_validate(tweet_model)
+        invalidate_feed_cache()
+
+        return TweetOutSchema(tweet_id=tweet_id)
 
-    async def delete(self, tweet_id: int) -> SuccessOutSchema | int:
+    async def delete(self, tweet_id: int) -> SuccessOutSchema:
         """
         Удаляет твит по идентификатору.
 
@@ -158,23 +291,20 @@ class TweetService:
             tweet_id (int): Идентификатор твита.
 
         Возвращает:
-            SuccessOutSchema | int: Результат удаления или код ошибки.
+            SuccessOutSchema: Результат удаления.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        tweet = await self._session.get(Tweet, tweet_id)
+        # Автор твита не нужен, лайки подгружаются для каскадного удаления
+        tweet = await self._session.get(Tweet, tweet_id, options=[lazyload(Tweet.user)])
 
         if not tweet:
-            return 404
+            raise ServiceException(404, "NotFound", "Твит не найден")
 
-        if tweet.user.api_key != self._api_key:
-            return 403
+        if tweet.user_id != self._user_id:
+            raise ServiceException(403, "Forbidden", "Недостаточно прав")
 
         await self._session.delete(tweet)
         await self._session.commit()
+        invalidate_feed_cache()
 
         return SuccessOutSchema(result=True)
 
@@ -185,26 +315,14 @@ class LikeService:
 
     Атрибуты:
         _session (AsyncSession): Асинхронная сессия базы данных.
-        _api_key (str): API ключ пользователя.
+        _user_id (int): Идентификатор текущего пользователя.
     """
 
-    def __init__(self, session: AsyncSession, api_key: str):
+    def __init__(self, session: AsyncSession, user_id: int):
         self._session = session
-        self._api_key = api_key
-
-    async def _user(self) -> User | None:
-        """
-        Получает пользователя по API ключу.
-
-        Возвращает:
-            User | None: Объект пользователя, если найден, иначе None.
-        """
-        user_select = await self._session.execute(
-            select(User).where(User.api_key == self._api_key)
-        )
-        return user_select.scalar_one_or_none()
+        self._user_id = user_id
 
-    async def post(self, tweet_id: int) -> SuccessOutSchema | int:
+    async def post(self, tweet_id: int) -> SuccessOutSchema:
         """
         Ставит лайк на твит.
 
@@ -212,31 +330,35 @@ class LikeService:
             tweet_id (int): Идентификатор твита, на который ставится лайк.
 
         Возвращает:
-            SuccessOutSchema | int: Результат операции или код ошибки.
+            SuccessOutSchema: Результат операции.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        tweet = await self._session.get(Tweet, tweet_id)
-
-        if not tweet:
-            return 404
-
-        like = Like(tweet_id=tweet_id, user_id=user.id)
-
-        self._session.add(like)
+        # Повторный лайк не вставляет строку (ON CONFLICT DO NOTHING), а несуществующий
+        # твит нарушает внешний ключ, поэтому отдельные проверки не нужны
+        like_insert = (
+            insert(Like)
+            .values(tweet_id=tweet_id, user_id=self._user_id)
+            .on_conflict_do_nothing(index_elements=[Like.tweet_id, Like.user_id])
+            .returning(Like.tweet_id)
+        )
 
         try:
-            await self._session.commit()
-        except IntegrityError:
+            like_select = await self._session.execute(like_insert)
+        except IntegrityError as exc:
             await self._session.rollback()
-            return 400
+            if not is_foreign_key_violation(exc):
+                raise
+            raise ServiceException(404, "NotFound", "Твит не найден")
+
+        if like_select.first() is None:
+            await self._session.rollback()
+            raise ServiceException(400, "LikeError", "Лайк уже стоит")
+
+        await self._session.commit()
+        invalidate_feed_cache()
 
         return SuccessOutSchema(result=True)
 
-    async def delete(self, tweet_id: int) -> SuccessOutSchema | int:
+    async def delete(self, tweet_id: int) -> SuccessOutSchema:
         """
         Убирает лайк с твита.
 
@@ -244,27 +366,23 @@ class LikeService:
             tweet_id (int): Идентификатор твита, с которого убирается лайк.
 
         Возвращает:
-            SuccessOutSchema | int: Результат операции или код ошибки.
+            SuccessOutSchema: Результат операции.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
         tweet_like_select = await self._session.execute(
             select(Like).where(
                 Like.tweet_id == tweet_id,
-                Like.user_id == user.id,
+                Like.user_id == self._user_id,
             )
         )
 
         tweet_like = tweet_like_select.scalar_one_or_none()
 
         if not tweet_like:
-            return 404
+            raise ServiceException(404, "NotFound", "Твит не найден")
 
         await self._session.delete(tweet_like)
         await self._session.commit()
+        invalidate_feed_cache()
 
         return SuccessOutSchema(result=True)
 
@@ -275,26 +393,14 @@ class MediaService:
 
     Атрибуты:
         _session (AsyncSession): Асинхронная сессия базы данных.
-        _api_key (str): API ключ пользователя.
+        _user_id (int): Идентификатор текущего пользователя.
     """
 
-    def __init__(self, session: AsyncSession, api_key: str):
+    def __init__(self, session: AsyncSession, user_id: int):
         self._session = session
-        self._api_key = api_key
+        self._user_id = user_id
 
-    async def _user(self) -> User | None:
-        """
-        Получает пользователя по API ключу.
-
-        Возвращает:
-            User | None: Объект пользователя, если найден, иначе None.
-        """
-        user_select = await self._session.execute(
-            select(User).where(User.api_key == self._api_key)
-        )
-        return user_select.scalar_one_or_none()
-
-    async def post(self, file: UploadFile) -> MediaOutSchema | int:
+    async def post(self, file: UploadFile) -> MediaOutSchema:
         """
         Загружает новый медиафайл.
 
@@ -302,29 +408,23 @@ class MediaService:
             file (UploadFile): Загружаемый файл.
 
         Возвращает:
-            MediaOutSchema | int: Данные о загруженном медиафайле или код ошибки.
+            MediaOutSchema: Данные о загруженном медиафайле.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        content = await file.read()
-
         if file.filename is None:
-            return 404
+            raise ServiceException(404, "NotFound", "Файл не найден")
 
-        filename, extension = os.path.splitext(file.filename)
-
-        if len(content) > MAX_FILE_SIZE:
-            return 400
+        # Если размер файла известен заранее, слишком большой файл отклоняется без чтения
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            raise file_size_exception()
 
-        path_img = await create_path_img(user, filename, extension)
+        filename, extension = os.path.splitext(file.filename)
+        path_img = await create_path_img(self._user_id, filename, extension)
 
-        async with aiofiles.open(path_img, "wb") as img:
-            await img.write(content)
+        # Файл пишется на диск по частям, чтобы не держать его целиком в памяти
+        if not await save_img(file.file, path_img):
+            raise file_size_exception()
 
-        media = Media(path_file=path_img, user_id=user.id)
+        media = Media(path_file=path_img, user_id=self._user_id)
 
         self._session.add(media)
         await self._session.commit()
@@ -339,62 +439,77 @@ class UserService:
 
     Атрибуты:
         _session (AsyncSession): Асинхронная сессия базы данных.
-        _api_key (Optional[str]): API ключ пользователя (может быть None).
     """
 
-    def __init__(self, session: AsyncSession, api_key: Optional[str] = None):
+    def __init__(self, session: AsyncSession):
         self._session = session
-        self._api_key = api_key
 
-    async def _user(self, user_id: Optional[int] = None) -> User | None:
+    async def _user(self, user_id: int) -> User | None:
         """
-        Получает пользователя по идентификатору или API ключу.
+        Получает пользователя по идентификатору вместе с подписками и подписчиками.
 
         Параметры:
-            user_id (Optional[int]): Идентификатор пользователя (если указан).
+            user_id (int): Идентификатор пользователя.
 
         Возвращает:
             User | None: Объект пользователя, если найден, иначе None.
         """
+        followed_user = aliased(User)
+        following = aliased(Follow)
+
+        # Через LEFT JOIN загружается только одна коллекция: соединение с подписками и подписчиками
+        # сразу дало бы произведение строк. Подписчики загружаются отдельным запросом IN,
+        # обращение к остальным связям вызывает ошибку вместо скрытого запроса
         user_select = await self._session.execute(
             select(User)
+            .outerjoin(following, User.following.of_type(following))
+            .outerjoin(followed_user, following.followed.of_type(followed_user))
             .options(
-                selectinload(User.following).selectinload(Follow.followed),
-                selectinload(User.followers).selectinload(Follow.follower),
+                contains_eager(User.following.of_type(following)).raiseload("*"),
+                contains_eager(User.following.of_type(following))
+                .contains_eager(following.followed.of_type(followed_user))
+                .raiseload("*"),
+                selectinload(User.followers).raiseload("*"),
+                selectinload(User.followers)
+                .selectinload(Follow.follower)
+                .raiseload("*"),
+                raiseload("*"),
             )
-            .where(User.id == user_id if user_id else User.api_key == self._api_key)
+            .where(User.id == user_id)
         )
-        return user_select.scalar()
+        return user_select.unique().scalar()
 
-    async def get(self, user_id: Optional[int] = None) -> SuccessOutUserSchema | int:
+    async def get(self, user_id: int) -> SuccessOutUserSchema:
         """
-        Получает данные о пользователе по идентификатору или API ключу.
+        Получает данные о пользователе по идентификатору.
 
         Параметры:
-            user_id (Optional[int]): Идентификатор пользователя (если указан).
+            user_id (int): Идентификатор пользователя.
 
         Возвращает:
-            SuccessOutUserSchema | int: Данные о пользователе или код ошибки.
+            SuccessOutUserSchema: Данные о пользователе.
         """
         user = await self._user(user_id=user_id)
 
         if not user:
-            return 401
+            raise ServiceException(401, "Unauthorized", "Пользователь не найден")
 
-        user_data = UserOutSchema(
-            id=int(user.id),
-            name=str(user.name),
+        # Как и в ленте твитов, данные из базы данных не валидируются повторно
+        user_schema = UserSchema.model_construct
+        user_data = UserOutSchema.model_construct(
+            id=user.id,
+            name=user.name,
             followers=[
-                UserSchema(id=int(follow.follower.id), name=str(follow.follower.name))
+                user_schema(id=follow.follower.id, name=follow.follower.name)
                 for follow in user.followers
             ],
             following=[
-                UserSchema(id=int(follow.followed.id), name=str(follow.followed.name))
+                user_schema(id=follow.followed.id, name=follow.followed.name)
                 for follow in user.following
             ],
         )
 
-        return SuccessOutUserSchema(user=user_data)
+        return SuccessOutUserSchema.model_construct(user=user_data)
 
 
 class FollowService:
@@ -403,26 +518,14 @@ class FollowService:
 
     Атрибуты:
          _session (AsyncSession): Асинхронная сессия базы данных.
-         _api_key (str): API ключ пользователя.
+         _user_id (int): Идентификатор текущего пользователя.
     """
 
-    def __init__(self, session: AsyncSession, api_key: str):
+    def __init__(self, session: AsyncSession, user_id: int):
         self._session = session
-        self._api_key = api_key
+        self._user_id = user_id
 
-    async def _user(self) -> User | None:
-        """
-        Получает пользователя по API ключу.
-
-        Возвращает:
-            User | None: Объект пользователя, если найден, иначе None.
-        """
-        user_select = await self._session.execute(
-            select(User).where(User.api_key == self._api_key)
-        )
-        return user_select.scalar_one_or_none()
-
-    async def post(self, user_id: int) -> SuccessOutSchema | int:
+    async def post(self, user_id: int) -> SuccessOutSchema:
         """
         Подписывается на другого пользователя.
 
@@ -430,37 +533,46 @@ class FollowService:
             user_id (int): Идентификатор пользователя для подписки.
 
         Возвращает:
-            SuccessOutSchema | int: Результат операции или код ошибки.
+            SuccessOutSchema: Результат операции.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        if user.id == user_id:
-            return 400
+        if self._user_id == user_id:
+            raise ServiceException(
+                400, "FollowError", "Вы не можете подписаться на себя"
+            )
 
-        following_user_select = await self._session.execute(
-            select(User.id).where(User.id == user_id)
+        # Повторная подписка не вставляет строку (ON CONFLICT DO NOTHING), а несуществующий
+        # пользователь нарушает внешний ключ, поэтому отдельные проверки не нужны
+        following_insert = (
+            insert(Follow)
+            .values(follower_id=self._user_id, followed_id=user_id)
+            .on_conflict_do_nothing(
+                index_elements=[Follow.follower_id, Follow.followed_id]
+            )
+            .returning(Follow.followed_id)
         )
-        following_user = following_user_select.scalar_one_or_none()
-
-        if not following_user:
-            return 404
-
-        following = Follow(follower_id=user.id, followed_id=user_id)
-
-        self._session.add(following)
 
         try:
-            await self._session.commit()
-        except IntegrityError:
+            following_select = await self._session.execute(following_insert)
+        except IntegrityError as exc:
             await self._session.rollback()
-            return 409
+            if not is_foreign_key_violation(exc):
+                raise
+            raise ServiceException(
+                404, "NotFound", "Пользователь для подписки не найден"
+            )
+
+        if following_select.first() is None:
+            await self._session.rollback()
+            raise ServiceException(
+                409, "FollowError", "Вы уже подписаны на пользователя"
+            )
+
+        await self._session.commit()
+        invalidate_feed_cache()
 
         return SuccessOutSchema(result=True)
 
-    async def delete(self, user_id: int) -> SuccessOutSchema | int:
+    async def delete(self, user_id: int) -> SuccessOutSchema:
         """
         Отписывается от другого пользователя.
 
@@ -468,19 +580,16 @@ class FollowService:
             user_id (int): Идентификатор пользователя для отписки.
 
         Возвращает:
-            SuccessOutSchema | int: Результат операции или код ошибки.
+            SuccessOutSchema: Результат операции.
         """
-        user = await self._user()
-
-        if not user:
-            return 401
-
-        if user.id == user_id:
-            return 400
+        if self._user_id == user_id:
+            raise ServiceException(
+                400, "FollowError", "Вы не можете отписаться от себя"
+            )
 
         following_model = await self._session.execute(
             select(Follow).where(
-                Follow.follower_id == user.id,
+                Follow.follower_id == self._user_id,
                 Follow.followed_id == user_id,
             )
         )
@@ -488,9 +597,10 @@ class FollowService:
         following = following_model.scalar_one_or_none()
 
         if not following:
-            return 404
+            raise ServiceException(404, "NotFound", "Подписка не найдена")
 
         await self._session.delete(following)
         await self._session.commit()
+        invalidate_feed_cache()
 
         return SuccessOutSchema(result=True)
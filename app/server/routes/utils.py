@@ -1,72 +1,162 @@
+import asyncio
 import os
+import re
+from functools import lru_cache
+from typing import BinaryIO
 
-from fastapi.responses import JSONResponse
-from models.models import Tweet, User
-from schemas.schemas import ExceptionOutSchema
+import orjson
+from config import MAX_FILE_SIZE, UPLOAD_CHUNK_SIZE
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel
 
 
-async def create_path_img(user: User, filename: str, extension: str) -> str:
+class ServiceException(HTTPException):
     """
-    Создает уникальный путь для сохранения изображения, загружаемого пользователем.
+    Ошибка сервиса, которая возвращается клиенту в формате ExceptionOutSchema.
+
+    Атрибуты:
+        status_code (int): Код статуса HTTP ответа.
+        error_type (str): Тип ошибки.
+        error_message (str): Сообщение об ошибке.
+    """
+
+    def __init__(self, status_code: int, error_type: str, error_message: str):
+        super().__init__(status_code=status_code, detail=error_message)
+        self.error_type = error_type
+        self.error_message = error_message
+
+
+def _free_path_img(base_path: str, filename: str, extension: str) -> str:
+    """
+    Подбирает свободное имя файла в каталоге пользователя.
+
+    Каталог читается один раз, следующий номер файла вычисляется по уже сохраненным
+    файлам с тем же именем.
 
     Параметры:
-        user (User): Объект пользователя.
+        base_path (str): Каталог изображений пользователя.
         filename (str): Имя файла изображения.
         extension (str): Расширение файла изображения.
 
     Возвращает:
-        str: Уникальный путь для сохранения изображения.
+        str: Свободный путь для сохранения изображения.
     """
-    counter = 1
-
-    base_path = "./images/{user_id}".format(user_id=user.id)
     os.makedirs(base_path, exist_ok=True)
+    entries = set(os.listdir(base_path))
+
+    if (
+        "{filename}{extension}".format(filename=filename, extension=extension)
+        not in entries
+    ):
+        return "{base_path}/{filename}{extension}".format(
+            base_path=base_path,
+            filename=filename,
+            extension=extension,
+        )
+
+    pattern = re.compile(
+        r"{filename}_(\d+){extension}".format(
+            filename=re.escape(filename), extension=re.escape(extension)
+        )
+    )
+    counters = [
+        int(match.group(1)) for match in map(pattern.fullmatch, entries) if match
+    ]
 
-    path_img = "{base_path}/{filename}{extension}".format(
+    return "{base_path}/{filename}_{counter}{extension}".format(
         base_path=base_path,
         filename=filename,
         extension=extension,
+        counter=max(counters, default=0) + 1,
     )
 
-    while os.path.exists(path_img):
-        path_img = "{base_path}/{filename}_{counter}{extension}".format(
-            base_path=base_path,
-            filename=filename,
-            extension=extension,
-            counter=counter,
-        )
 
-        counter += 1
+async def create_path_img(user_id: int, filename: str, extension: str) -> str:
+    """
+    Создает уникальный путь для сохранения изображения, загружаемого пользователем.
+
+    Работа с файловой системой выполняется в отдельном потоке, чтобы не блокировать цикл событий.
+
+    Параметры:
+        user_id (int): Идентификатор пользователя.
+        filename (str): Имя файла изображения.
+        extension (str): Расширение файла изображения.
+
+    Возвращает:
+        str: Уникальный путь для сохранения изображения.
+    """
+    base_path = "./images/{user_id}".format(user_id=user_id)
 
-    return path_img
+    return await asyncio.to_thread(_free_path_img, base_path, filename, extension)
 
 
-def sorted_tweets(tweets_list: list[Tweet], following_users: list[int]) -> list[Tweet]:
+def _write_img(file: BinaryIO, path_img: str) -> bool:
     """
-    Сортирует список твитов в порядке убывания по следующим критериям:
-    1. Твиты, на которые подписан пользователь, идут первыми (в приоритете лайк пользователя, так настроен роут).
-    2. Твиты с большим количеством лайков идут выше.
+    Копирует загруженный файл на диск по частям, пока не превышен максимальный размер.
 
     Параметры:
-        tweets_list (list[Tweet]): Список твитов для сортировки.
-        following_users (list[int]): Список идентификаторов пользователей, на которых подписан текущий пользователь.
+        file (BinaryIO): Загруженный файл.
+        path_img (str): Путь для сохранения изображения.
 
     Возвращает:
-        list[Tweet]: Отсортированный список твитов.
-    """
-    return sorted(
-        tweets_list,
-        key=lambda t: (
-            any(like.user_id in following_users for like in t.likes),
-            len(t.likes),
-        ),
-        reverse=True,
+        bool: True, если файл сохранен, False, если файл превысил максимальный размер и удален.
+    """
+    size = 0
+
+    with open(path_img, "wb") as img:
+        while chunk := file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_FILE_SIZE:
+                break
+            img.write(chunk)
+
+    if size > MAX_FILE_SIZE:
+        os.remove(path_img)
+        return False
+
+    return True
+
+
+async def save_img(file: BinaryIO, path_img: str) -> bool:
+    """
+    Сохраняет загруженное изображение на диск.
+
+    Файл целиком копируется в одном отдельном потоке, без переключения в цикл событий
+    на каждой части файла.
+
+    Параметры:
+        file (BinaryIO): Загруженный файл.
+        path_img (str): Путь для сохранения изображения.
+
+    Возвращает:
+        bool: True, если файл сохранен, False, если файл превысил максимальный размер.
+    """
+    return await asyncio.to_thread(_write_img, file, path_img)
+
+
+@lru_cache(maxsize=128)
+def exception_content(error_type: str, error_message: str) -> bytes:
+    """
+    Возвращает тело JSON ответа с ошибкой.
+
+    Набор ошибок сервисов ограничен, поэтому тело каждой ошибки сериализуется один раз
+    и дальше берется из кэша.
+
+    Параметры:
+        error_type (str): Тип ошибки.
+        error_message (str): Сообщение об ошибке.
+
+    Возвращает:
+        bytes: Тело ответа с ошибкой в формате JSON.
+    """
+    # Форма ответа с ошибкой постоянна, поэтому тело собирается без схемы ExceptionOutSchema
+    return orjson.dumps(
+        {"result": False, "error_type": error_type, "error_message": error_message}
     )
 
 
-def return_exception(
-    error_type: str, error_message: str, status_code: int
-) -> JSONResponse:
+def return_exception(error_type: str, error_message: str, status_code: int) -> Response:
     """
     Возвращает JSON ответ с ошибкой.
 
@@ -76,12 +166,51 @@ def return_exception(
         status_code (int): Код статуса HTTP ответа (по умолчанию 404).
 
     Возвращает:
-        JSONResponse: Ответ с ошибкой в формате JSON.
+        Response: Ответ с ошибкой в формате JSON.
     """
-    return JSONResponse(
+    return Response(
+        content=exception_content(error_type, error_message),
         status_code=status_code,
-        content=ExceptionOutSchema(
-            error_type=error_type,
-            error_message=error_message,
-        ).model_dump(),
+        media_type="application/json",
+    )
+
+
+def return_result(result: BaseModel, status_code: int = 200) -> Response:
+    """
+    Возвращает JSON ответ с успешным результатом.
+
+    Схема сериализуется один раз сразу в байты (by_alias, как в response_model),
+    поэтому FastAPI не валидирует и не сериализует ответ повторно.
+
+    Параметры:
+        result (BaseModel): Схема с результатом.
+        status_code (int): Код статуса HTTP ответа (по умолчанию 200).
+
+    Возвращает:
+        Response: Ответ с результатом в формате JSON.
+    """
+    return Response(
+        content=result.model_dump_json(by_alias=True),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+async def service_exception_handler(
+    request: Request, exc: ServiceException
+) -> Response:
+    """
+    Обработчик ошибок сервисов, преобразующий их в JSON ответ с ошибкой.
+
+    Параметры:
+        request (Request): Запрос, при обработке которого возникла ошибка.
+        exc (ServiceException): Ошибка сервиса.
+
+    Возвращает:
+        Response: Ответ с ошибкой в формате JSON.
+    """
+    return return_exception(
+        error_type=exc.error_type,
+        error_message=exc.error_message,
+        status_code=exc.status_code,
     )
@@ -1,32 +1,44 @@
 import os
+import secrets
 from typing import AsyncGenerator
 
 import pytest
+import pytest_asyncio
 from dotenv import load_dotenv
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import NullPool
+from sqlalchemy import event, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 load_dotenv()
 os.environ["ENV"] = "test"
+# Возможная проблема N+1 в тестах приводит к ошибке запроса, а не только к предупреждению
+os.environ.setdefault("QUERY_COUNT_RAISE", "true")
 
 if os.getenv("ENV") == "test":
+    # Модуль импортируется так же, как в приложении, чтобы счетчик запросов был общим с middleware
+    from database.database import count_query
+
     from app.server.main import app as _app
     from app.server.models.models import Base, User
-    from app.server.routes.routes import get_session
-
-    from .factories import UserFactory
+    from app.server.routes.routes import (
+        get_auth_session,
+        get_readonly_session,
+        get_session,
+    )
 
     url_engine = os.getenv("SQLALCHEMY_PATH_TEST_ASYNC")
     if not url_engine:
         raise ValueError("URL для тестовой базы данных не установлен")
 
-    # NullPool создает новое соединение каждый раз, когда оно требуется, и закрывает его, когда оно больше не нужно
-    engine = create_async_engine(url_engine, poolclass=NullPool)
+    # Соединения пула привязаны к циклу событий, поэтому все тесты выполняются в одном цикле сессии
+    # (см. pytest_collection_modifyitems) и переиспользуют соединения вместо открытия нового на каждый запрос
+    engine = create_async_engine(url_engine, pool_size=5, max_overflow=5)
     async_session = async_sessionmaker(
         expire_on_commit=False,
         bind=engine,
     )
+    # Счетчик SQL запросов слушает только движок приложения, поэтому подключается и к тестовому
+    event.listen(engine.sync_engine, "before_cursor_execute", count_query)
 
     async def override_get_session() -> AsyncGenerator[AsyncSession, None]:
         """
@@ -38,7 +50,18 @@ if os.getenv("ENV") == "test":
         async with async_session() as s:
             yield s
 
+    def pytest_collection_modifyitems(items: list[pytest.Item]) -> None:
+        """
+        Запускает все асинхронные тесты в цикле событий сессии, общем с фикстурами.
+        """
+        session_scope_marker = pytest.mark.asyncio(loop_scope="session")
+        for item in items:
+            if pytest_asyncio.is_async_test(item):
+                item.add_marker(session_scope_marker, append=False)
+
     _app.dependency_overrides[get_session] = override_get_session
+    _app.dependency_overrides[get_readonly_session] = override_get_session
+    _app.dependency_overrides[get_auth_session] = override_get_session
 
     @pytest.fixture(scope="session", autouse=True)
     async def setup_test_db() -> AsyncGenerator[None, None]:
@@ -52,10 +75,15 @@ if os.getenv("ENV") == "test":
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
 
+        # Пользователи добавляются одним INSERT запросом, API ключи генерируются как 64 символа hex
         async with async_session() as s:
-            UserFactory._meta.sqlalchemy_session_factory = lambda: s  # type: ignore[misc, attr-defined]
-            new_user: list[User] = UserFactory.create_batch(10)
-            s.add_all(new_user)
+            await s.execute(
+                insert(User),
+                [
+                    {"name": "user{i}".format(i=i), "api_key": secrets.token_hex(32)}
+                    for i in range(1, 11)
+                ],
+            )
             await s.commit()
 
         yield
@@ -64,24 +92,29 @@ if os.getenv("ENV") == "test":
             await conn.run_sync(Base.metadata.drop_all)
         await engine.dispose()
 
-    @pytest.fixture
-    async def session() -> AsyncGenerator[AsyncSession, None]:
+    @pytest.fixture(scope="session")
+    async def auth_headers(setup_test_db: None) -> dict[int, dict[str, str]]:
         """
-        Создает новую асинхронную сессию для тестов.
+        Собирает заголовки авторизации тестовых пользователей одним запросом на всю сессию тестов.
 
         Возвращает:
-            AsyncGenerator[AsyncSession, None]: Асинхронный генератор сессии базы данных.
+            dict[int, dict[str, str]]: Соответствие идентификатора пользователя заголовкам с его API ключом.
         """
         async with async_session() as s:
-            yield s
+            users_select = await s.execute(select(User.id, User.api_key))
+        return {
+            user_id: {"api-key": api_key} for user_id, api_key in users_select.tuples()
+        }
 
-    @pytest.fixture
+    @pytest.fixture(scope="session")
     async def client() -> AsyncGenerator[AsyncClient, None]:
         """
-        Создает асинхронного клиента для тестирования HTTP-запросов.
+        Создает асинхронного клиента для тестирования HTTP-запросов, общего для всех тестов.
 
         Возвращает:
             AsyncGenerator[AsyncClient, None]: Асинхронный клиент для выполнения запросов к приложению.
         """
-        async with AsyncClient(transport=ASGITransport(app=_app)) as c:
+        async with AsyncClient(
+            transport=ASGITransport(app=_app), base_url="http://testhost"
+        ) as c:
             yield c
@@ -1,32 +1,24 @@
+import io
 import os
 import shutil
+from pathlib import Path
 
 import aiofiles
+from config import MAX_FILE_SIZE
 from httpx import AsyncClient
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from routes.utils import save_img
 
-from app.server.models.models import User
+TWEETS_URL = "/api/tweets"
+MEDIAS_URL = "/api/medias"
 
 
 async def test_add_tweet_with_media_fall(
-    session: AsyncSession, client: AsyncClient
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
 ) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
     new_tweet = {"tweet_data": "test tweet with media", "tweet_media_ids": [1]}
     response = await client.post(
-        "http://testhost/api/tweets",
-        headers={"api-key": api_key},
+        TWEETS_URL,
+        headers=auth_headers[1],
         json=new_tweet,
     )
 
@@ -34,18 +26,9 @@ async def test_add_tweet_with_media_fall(
     assert response.json()["result"] is False
 
 
-async def test_add_media(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
+async def test_add_media(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
     img_path = os.path.join(
         os.path.dirname(os.path.abspath(__file__)), "images", "winter-1.jpg"
     )
@@ -53,8 +36,8 @@ async def test_add_media(session: AsyncSession, client: AsyncClient) -> None:
     async with aiofiles.open(img_path, "rb") as img_file:
         file = await img_file.read()
         response = await client.post(
-            "http://testhost/api/medias",
-            headers={"api-key": api_key},
+            MEDIAS_URL,
+            headers=auth_headers[1],
             files={"file": ("winter-1.jpg", file, "image/jpeg")},
         )
 
@@ -63,22 +46,13 @@ async def test_add_media(session: AsyncSession, client: AsyncClient) -> None:
     assert response.json()["result"] is True
 
 
-async def test_add_tweet_with_media(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
+async def test_add_tweet_with_media(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
     new_tweet = {"tweet_data": "test tweet with media", "tweet_media_ids": [1]}
     response = await client.post(
-        "http://testhost/api/tweets",
-        headers={"api-key": api_key},
+        TWEETS_URL,
+        headers=auth_headers[1],
         json=new_tweet,
     )
 
@@ -86,21 +60,10 @@ async def test_add_tweet_with_media(session: AsyncSession, client: AsyncClient)
     assert response.json()["result"] is True
 
 
-async def test_check_tweets(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.get(
-        "http://testhost/api/tweets", headers={"api-key": api_key}
-    )
+async def test_check_tweets(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    response = await client.get(TWEETS_URL, headers=auth_headers[1])
 
     assert response.status_code == 200
     assert response.json()["result"] is True
@@ -112,3 +75,37 @@ def test_check_exist_files() -> None:
     img_path = os.path.join(files_path, "winter-1.jpg")
     assert os.path.exists(img_path)
     shutil.rmtree(files_path)
+
+
+async def test_add_media_too_large(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    response = await client.post(
+        MEDIAS_URL,
+        headers=auth_headers[2],
+        files={"file": ("large.jpg", os.urandom(MAX_FILE_SIZE + 1), "image/jpeg")},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["result"] is False
+    assert response.json()["error_type"] == "FileError"
+
+
+async def test_save_img_too_large(tmp_path: Path) -> None:
+    # Размер файла заранее неизвестен, поэтому превышение обнаруживается при записи на диск
+    path_img = tmp_path / "large.jpg"
+
+    saved = await save_img(io.BytesIO(os.urandom(MAX_FILE_SIZE + 1)), str(path_img))
+
+    assert saved is False
+    assert not path_img.exists()
+
+
+async def test_save_img(tmp_path: Path) -> None:
+    path_img = tmp_path / "image.jpg"
+    content = os.urandom(MAX_FILE_SIZE)
+
+    saved = await save_img(io.BytesIO(content), str(path_img))
+
+    assert saved is True
+    assert path_img.read_bytes() == content
@@ -0,0 +1,34 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+ME_URL = "/api/users/me"
+
+
+async def test_query_count_warning(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    caplog: pytest.LogCaptureFixture,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("app.server.main.QUERY_COUNT_WARNING", 0)
+    monkeypatch.setattr("app.server.main.QUERY_COUNT_RAISE", False)
+
+    with caplog.at_level(logging.WARNING, logger="app.server.main"):
+        response = await client.get(ME_URL, headers=auth_headers[1])
+
+    assert response.status_code == 200
+    assert "GET {url}".format(url=ME_URL) in caplog.text
+    assert "возможна проблема N+1" in caplog.text
+
+
+async def test_query_count_raise(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("app.server.main.QUERY_COUNT_WARNING", 0)
+
+    with pytest.raises(RuntimeError, match="возможна проблема N\\+1"):
+        await client.get(ME_URL, headers=auth_headers[1])
@@ -1,116 +1,216 @@
+import asyncio
+from typing import Any
+
 import pytest
+from config import TWEETS_SERIALIZATION_SLICE
 from httpx import AsyncClient
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from routes.services import dump_tweets_json
+from schemas.schemas import (
+    AuthorSchema,
+    LikeSchema,
+    TweetOutForListSchema,
+    TweetsOutSchema,
+)
 
-from app.server.models.models import User
+TWEETS_URL = "/api/tweets"
+LIKES_URL = "/api/tweets/1/likes"
 
 
 # Не нужно писать, так как настроил в pytest.ini
 # @pytest.mark.asyncio
-@pytest.mark.parametrize("user_id", [1, 2, 5, 9, 10])
 async def test_add_tweet(
-    session: AsyncSession, client: AsyncClient, user_id: int
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
 ) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == user_id))
-    get_user: User | None = get_user_select.scalar_one_or_none()
+    # Твиты разных пользователей независимы, поэтому запросы отправляются одновременно
+    responses = await asyncio.gather(
+        *[
+            client.post(
+                TWEETS_URL,
+                headers=auth_headers[user_id],
+                json={"tweet_data": f"test tweet {user_id}"},
+            )
+            for user_id in (1, 2, 5, 9, 10)
+        ]
+    )
 
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
+    for response in responses:
+        assert response.status_code == 201
+        assert response.json()["result"] is True
+
+
+# Первый запрос выполняет действие, повторный запрос возвращает ошибку
+@pytest.mark.parametrize(
+    "expected_status, expected_result",
+    [(201, True), (400, False)],
+    ids=["first", "repeat"],
+)
+async def test_like(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    expected_status: int,
+    expected_result: bool,
+) -> None:
+    response = await client.post(LIKES_URL, headers=auth_headers[1])
+
+    assert response.status_code == expected_status
+    assert response.json()["result"] is expected_result
+
+
+@pytest.mark.parametrize(
+    "expected_status, expected_result",
+    [(200, True), (404, False)],
+    ids=["first", "repeat"],
+)
+async def test_dislike(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    expected_status: int,
+    expected_result: bool,
+) -> None:
+    response = await client.delete(LIKES_URL, headers=auth_headers[1])
 
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
+    assert response.status_code == expected_status
+    assert response.json()["result"] is expected_result
 
-    new_tweet = {
-        "tweet_data": "test tweet {num}".format(num=user_id),
-    }
-    response = await client.post(
-        "http://testhost/api/tweets",
-        headers={"api-key": api_key},
-        json=new_tweet,
-    )
-
-    assert response.status_code == 201
-    assert response.json()["result"] is True
 
+async def test_like_missing_tweet(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    response = await client.post("/api/tweets/9999/likes", headers=auth_headers[1])
 
-async def test_like(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
+    assert response.status_code == 404
+    assert response.json()["result"] is False
 
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
 
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
+async def test_dump_tweets_json() -> None:
+    # Лента из нескольких срезов склеивается в тот же JSON, что и при сериализации целиком
+    result = TweetsOutSchema(
+        tweets=[
+            TweetOutForListSchema(
+                id=tweet_id,
+                content=f"tweet {tweet_id}",
+                attachments=[],
+                author=AuthorSchema(id=1, name="user1"),
+                likes=[LikeSchema(user_id=2, name="user2")],
+            )
+            for tweet_id in range(2 * TWEETS_SERIALIZATION_SLICE + 1)
+        ]
+    )
 
-    response = await client.post(
-        "http://testhost/api/tweets/1/likes", headers={"api-key": api_key}
+    assert (
+        await dump_tweets_json(result) == result.model_dump_json(by_alias=True).encode()
     )
+    assert await dump_tweets_json(TweetsOutSchema()) == b'{"result":true,"tweets":[]}'
 
-    assert response.status_code == 201
-    assert response.json()["result"] is True
 
+def feed_ids(body: dict[str, Any]) -> list[int]:
+    return [tweet["id"] for tweet in body["tweets"]]
 
-async def test_repeat_like(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
 
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
+async def test_feed_cache_invalidation(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    # Первый запрос кэширует ленту пользователя 3
+    response = await client.get(TWEETS_URL, headers=auth_headers[3])
+    assert response.status_code == 200
+
+    # Лайк появляется в ленте сразу
+    response = await client.post("/api/tweets/2/likes", headers=auth_headers[3])
+    assert response.status_code == 201
 
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
+    body = (await client.get(TWEETS_URL, headers=auth_headers[3])).json()
+    tweet = next(tweet for tweet in body["tweets"] if tweet["id"] == 2)
+    assert {"user_id": 3, "name": "user3"} in tweet["likes"]
 
+    # Новый твит появляется в ленте сразу
     response = await client.post(
-        "http://testhost/api/tweets/1/likes", headers={"api-key": api_key}
+        TWEETS_URL, headers=auth_headers[3], json={"tweet_data": "feed cache tweet"}
     )
+    assert response.status_code == 201
+    tweet_id = response.json()["tweet_id"]
 
-    assert response.status_code == 400
-    assert response.json()["result"] is False
-
+    body = (await client.get(TWEETS_URL, headers=auth_headers[3])).json()
+    assert tweet_id in feed_ids(body)
 
-async def test_dislike(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
+    # Твит 5 лайкнул пользователь 4, твит 4 набрал больше лайков от других пользователей
+    for user_id, like_tweet_id in ((4, 5), (5, 4), (6, 4)):
+        response = await client.post(
+            "/api/tweets/{tweet_id}/likes".format(tweet_id=like_tweet_id),
+            headers=auth_headers[user_id],
+        )
+        assert response.status_code == 201
 
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
+    ids = feed_ids((await client.get(TWEETS_URL, headers=auth_headers[3])).json())
+    assert ids.index(4) < ids.index(5)
 
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
+    # После подписки на пользователя 4 лайкнутый им твит поднимается выше сразу
+    response = await client.post("/api/users/4/follow", headers=auth_headers[3])
+    assert response.status_code == 201
 
-    response = await client.delete(
-        "http://testhost/api/tweets/1/likes", headers={"api-key": api_key}
-    )
+    ids = feed_ids((await client.get(TWEETS_URL, headers=auth_headers[3])).json())
+    assert ids.index(5) < ids.index(4)
 
+    response = await client.delete("/api/users/4/follow", headers=auth_headers[3])
     assert response.status_code == 200
-    assert response.json()["result"] is True
-
-
-async def test_repeat_dislike(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
 
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
 
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.delete(
-        "http://testhost/api/tweets/1/likes", headers={"api-key": api_key}
-    )
+async def test_feed_order(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    # Пользователь 7 подписан на пользователя 8, остальные лайки от неподписанных пользователей
+    response = await client.post("/api/users/8/follow", headers=auth_headers[7])
+    assert response.status_code == 201
 
-    assert response.status_code == 404
-    assert response.json()["result"] is False
+    tweet_ids = []
+    for number in range(4):
+        response = await client.post(
+            TWEETS_URL,
+            headers=auth_headers[10],
+            json={"tweet_data": f"feed order tweet {number}"},
+        )
+        assert response.status_code == 201
+        tweet_ids.append(response.json()["tweet_id"])
+
+    followed_tweet, unfollowed_tweet, own_tweet, followed_tweet_same = tweet_ids
+    likes = {
+        followed_tweet: (8,),
+        unfollowed_tweet: (2, 3, 4),
+        own_tweet: (7, 2),
+        followed_tweet_same: (7,),
+    }
+    for tweet_id, user_ids in likes.items():
+        for user_id in user_ids:
+            response = await client.post(
+                "/api/tweets/{tweet_id}/likes".format(tweet_id=tweet_id),
+                headers=auth_headers[user_id],
+            )
+            assert response.status_code == 201
+
+    body = (await client.get(TWEETS_URL, headers=auth_headers[7])).json()
+    ids = feed_ids(body)
+
+    # Сначала твиты с лайком пользователя или его подписок, затем по количеству лайков, затем по id
+    assert [tweet_id for tweet_id in ids if tweet_id in likes] == [
+        own_tweet,
+        followed_tweet,
+        followed_tweet_same,
+        unfollowed_tweet,
+    ]
+    tweets = {tweet["id"]: tweet for tweet in body["tweets"]}
+    priority_users = {7, 8}
+
+    def order_key(tweet_id: int) -> tuple[bool, int, int]:
+        like_users = {like["user_id"] for like in tweets[tweet_id]["likes"]}
+        return not priority_users & like_users, -len(like_users), tweet_id
+
+    assert ids == sorted(ids, key=order_key)
+
+    # Лайки отдаются с именами их авторов
+    for tweet_id, user_ids in likes.items():
+        assert sorted(tweets[tweet_id]["likes"], key=lambda like: like["user_id"]) == [
+            {"user_id": user_id, "name": "user{id}".format(id=user_id)}
+            for user_id in sorted(user_ids)
+        ]
+
+    response = await client.delete("/api/users/8/follow", headers=auth_headers[7])
+    assert response.status_code == 200
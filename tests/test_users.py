@@ -1,109 +1,65 @@
+import pytest
 from httpx import AsyncClient
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.server.models.models import User
-
-
-async def test_follow(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.post(
-        "http://testhost/api/users/2/follow", headers={"api-key": api_key}
-    )
-    assert response.status_code == 201
-    assert response.json()["result"] is True
-
-
-async def test_repeat_follow(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.post(
-        "http://testhost/api/users/2/follow", headers={"api-key": api_key}
-    )
-
-    assert response.status_code == 409
-    assert response.json()["result"] is False
-
-
-async def test_unfollow(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.delete(
-        "http://testhost/api/users/2/follow", headers={"api-key": api_key}
-    )
-
-    assert response.status_code == 200
-    assert response.json()["result"] is True
-
-
-async def test_repeat_unfollow(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.delete(
-        "http://testhost/api/users/2/follow", headers={"api-key": api_key}
-    )
+FOLLOW_URL = "/api/users/2/follow"
+ME_URL = "/api/users/me"
+
+
+# Первый запрос выполняет действие, повторный запрос возвращает ошибку
+@pytest.mark.parametrize(
+    "expected_status, expected_result",
+    [(201, True), (409, False)],
+    ids=["first", "repeat"],
+)
+async def test_follow(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    expected_status: int,
+    expected_result: bool,
+) -> None:
+    response = await client.post(FOLLOW_URL, headers=auth_headers[1])
+
+    assert response.status_code == expected_status
+    assert response.json()["result"] is expected_result
+
+
+@pytest.mark.parametrize(
+    "expected_status, expected_result",
+    [(200, True), (404, False)],
+    ids=["first", "repeat"],
+)
+async def test_unfollow(
+    client: AsyncClient,
+    auth_headers: dict[int, dict[str, str]],
+    expected_status: int,
+    expected_result: bool,
+) -> None:
+    response = await client.delete(FOLLOW_URL, headers=auth_headers[1])
+
+    assert response.status_code == expected_status
+    assert response.json()["result"] is expected_result
+
+
+async def test_follow_missing_user(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    response = await client.post("/api/users/9999/follow", headers=auth_headers[1])
 
     assert response.status_code == 404
     assert response.json()["result"] is False
 
 
-async def test_get_user_me(session: AsyncSession, client: AsyncClient) -> None:
-    async with session:
-        get_user_select = await session.execute(select(User).where(User.id == 1))
-    get_user: User | None = get_user_select.scalar_one_or_none()
-
-    if not get_user:
-        raise AssertionError("Пользователь не найден")
-
-    api_key: str | None = get_user.api_key
-    if not api_key:
-        raise AssertionError("api_key не найден")
-
-    response = await client.get(
-        "http://testhost/api/users/me", headers={"api-key": api_key}
-    )
+async def test_get_user_me(
+    client: AsyncClient, auth_headers: dict[int, dict[str, str]]
+) -> None:
+    response = await client.get(ME_URL, headers=auth_headers[1])
 
     assert response.status_code == 200
-    assert response.json()["result"] is True
-    assert response.json()["user"]["id"] == get_user.id
-    assert isinstance(response.json()["user"]["followers"], list)
-    assert not response.json()["user"]["followers"]
-    assert isinstance(response.json()["user"]["following"], list)
-    assert not response.json()["user"]["following"]
+    body = response.json()
+    user = body["user"]
+    assert body["result"] is True
+    assert user["id"] == 1
+    assert isinstance(user["followers"], list)
+    assert not user["followers"]
+    assert isinstance(user["following"], list)
+    assert not user["following"]